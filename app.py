@@ -6,17 +6,15 @@ st.markdown("""
         }
     </style>
 """, unsafe_allow_html=True)
-import os
-from pymongo import MongoClient
+from db import get_database
 from dotenv import load_dotenv
 from urllib.parse import unquote
-from datetime import datetime
+from datetime import datetime, timezone
 import time
 
 load_dotenv()
 
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client["auth_system"]
+db = get_database()
 pending_users = db["pending_users"]
 verified_users = db["verified_users"]
 
@@ -53,7 +51,7 @@ def verify_email():
             st.error("Invalid verification link or email already verified.")
             return
 
-        if user["token_expiry"] < datetime.now():
+        if user["token_expiry"] < datetime.now(timezone.utc):
             st.error("Verification link has expired. Please register again.")
             pending_users.delete_one({"email": email})
             return
@@ -62,7 +60,7 @@ def verify_email():
             "name": user["name"],
             "email": user["email"],
             "password": user["password"],
-            "verified_at": datetime.now()
+            "verified_at": datetime.now(timezone.utc)
         })
         
         pending_users.delete_one({"email": email})
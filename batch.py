@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", 8))
+
+def iter_evaluations(entries, evaluate, max_workers=DEFAULT_CONCURRENCY, max_pending=None):
+    """Yield (index, entry, result, error, read) as evaluations finish.
+
+    entries may be a lazy iterator; it is only read while fewer than
+    max_pending evaluations are in flight, so evaluation starts on the first
+    entries while later ones are still being produced and memory stays
+    bounded. read is the number of entries taken from the input so far.
+    """
+    max_pending = max_pending or max_workers * 2
+    entries = enumerate(entries)
+    exhausted = False
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        read = 0
+        try:
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    try:
+                        idx, entry = next(entries)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[executor.submit(evaluate, *entry)] = (idx, entry)
+                    read = idx + 1
+                if not pending:
+                    return
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx, entry = pending.pop(future)
+                    error = future.exception()
+                    yield idx, entry, None if error else future.result(), error, read
+        finally:
+            for future in pending:
+                future.cancel()
+
+def iter_pack_evaluations(packs, evaluate_pack, max_workers=DEFAULT_CONCURRENCY, max_pending=None):
+    """Like iter_evaluations, but each unit of work is a list of entries.
+
+    evaluate_pack(pack) returns one result per entry, where an Exception
+    instance marks that entry as failed. Results are yielded per entry with
+    indices counted across packs.
+    """
+    starts = {}
+    read = [0]
+
+    def numbered():
+        for pack_idx, pack in enumerate(packs):
+            starts[pack_idx] = read[0]
+            read[0] += len(pack)
+            yield (pack,)
+
+    for pack_idx, (pack,), results, error, _ in iter_evaluations(numbered(), evaluate_pack, max_workers, max_pending):
+        start = starts.pop(pack_idx)
+        for offset, entry in enumerate(pack):
+            result = None if error else results[offset]
+            entry_error = error or (result if isinstance(result, Exception) else None)
+            yield start + offset, entry, None if entry_error else result, entry_error, read[0]
+
+def collect_results(evaluations, on_result=None):
+    """Gather (index, entry, result, error, read) events into lists aligned with the input.
+
+    Returns (entries, results, errors). on_result(done, total, index, entry,
+    result, error) is called from the calling thread as each evaluation finishes, so
+    it is safe to touch Streamlit there; total is the number of entries read
+    so far when the input is a generator.
+    """
+    read_entries = {}
+    results = {}
+    errors = {}
+
+    for done, (idx, entry, result, error, read) in enumerate(evaluations, 1):
+        read_entries[idx] = entry
+        results[idx] = result
+        errors[idx] = error
+        if on_result:
+            on_result(done, read, idx, entry, result, error)
+
+    order = range(len(read_entries))
+    return [read_entries[i] for i in order], [results[i] for i in order], [errors[i] for i in order]
+
+def evaluate_batch(entries, evaluate, max_workers=DEFAULT_CONCURRENCY, on_result=None):
+    """Run evaluate(prompt, response) over entries concurrently, keeping input order.
+
+    See collect_results for the return value and on_result.
+    """
+    return collect_results(iter_evaluations(entries, evaluate, max_workers), on_result)
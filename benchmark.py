@@ -0,0 +1,282 @@
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import openai
+
+import evaluator
+from batch import DEFAULT_CONCURRENCY, collect_results, evaluate_batch, iter_pack_evaluations
+from eval_cache import EvaluationCache
+from evaluator import (
+    RAI_PARAMETERS,
+    check_ai_generation,
+    evaluate_cached_pack,
+    iter_file_chunks,
+    iter_packs,
+    parse_prompts_responses,
+)
+from fake_openai import serve
+from ratelimit import RateLimiter
+from report import generate_pdf_report
+from usage import UsageMeter, usage_summary
+
+RESULTS_PATH = "benchmark_results.jsonl"
+# What pages/checker.py imports before first paint, and the libraries it now loads on demand.
+# db, history and jobs bring in pymongo, gridfs and bson at import time.
+STARTUP_IMPORTS = {
+    "checker": "batch, db, eval_cache, dedup, doc_cache, export, history, result_store, usage, jobs, "
+               "parameters, evaluator, ingest",
+    "deferred": "openai, pdfplumber, docx, chardet, reportlab.pdfgen.canvas"
+}
+WORDS = (
+    "model user answer data policy fair safe private account risk system people result "
+    "source reason context value review clear fact evidence process decision impact"
+).split()
+
+def synthetic_pairs(count, seed=0):
+    rng = random.Random(seed)
+    for n in range(count):
+        prompt = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+        response = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 200)))
+        yield f"{n}: {prompt}?", response + "."
+
+def synthetic_lines(count):
+    for prompt, response in synthetic_pairs(count):
+        yield f"Prompt: {prompt}"
+        yield f"Response: {response}"
+        yield ""
+
+def make_txt(count):
+    return "\n".join(synthetic_lines(count)).encode("utf-8")
+
+def make_docx(count):
+    import docx
+    document = docx.Document()
+    for line in synthetic_lines(count):
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def make_pdf(count):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    y = 750
+    for line in synthetic_lines(count):
+        while True:
+            pdf.drawString(40, y, line[:95])
+            y -= 14
+            if y < 40:
+                pdf.showPage()
+                y = 750
+            line = line[95:]
+            if not line:
+                break
+    pdf.save()
+    return buffer.getvalue()
+
+CORPUS_BUILDERS = {"txt": make_txt, "docx": make_docx, "pdf": make_pdf}
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def run_stage(name, items, work):
+    """Time work() under tracemalloc; work returns (output, per-item latencies)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    output, latencies = work()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stage = {
+        "stage": name,
+        "items": items(output),
+        "seconds": round(seconds, 4),
+        "throughput": round(items(output) / seconds, 2) if seconds else None,
+        "peak_mb": round(peak / 2 ** 20, 2)
+    }
+    if latencies:
+        stage["p50_ms"] = round(percentile(latencies, 0.5) * 1000, 2)
+        stage["p99_ms"] = round(percentile(latencies, 0.99) * 1000, 2)
+    return stage, output
+
+def timed(function):
+    latencies = []
+
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper, latencies
+
+def benchmark_corpus(file_format, count, args):
+    data = CORPUS_BUILDERS[file_format](count)
+    file = io.BytesIO(data)
+    file.name = f"corpus.{file_format}"
+    param_keys = list(RAI_PARAMETERS)
+    cache = EvaluationCache(":memory:")
+    stages = []
+
+    stage, text = run_stage("extract", lambda _: count, lambda: ("\n".join(iter_file_chunks(file)), None))
+    stages.append(stage)
+
+    stage, entries = run_stage("parse", len, lambda: (parse_prompts_responses(text), None))
+    stages.append(stage)
+
+    meter = UsageMeter()
+
+    def evaluate():
+        evaluate_pack, latencies = timed(
+            lambda pack: evaluate_cached_pack(cache, pack, param_keys, detect_ai=args.detect_ai, meter=meter)
+        )
+        _, results, _ = collect_results(
+            iter_pack_evaluations(iter_packs(entries, max_pairs=args.pack_max_pairs), evaluate_pack, args.concurrency)
+        )
+        return results, latencies
+    stage, results = run_stage("evaluate", lambda results: sum(1 for result in results if result), evaluate)
+    stage["usage"] = usage_summary(meter.totals())
+    stages.append(stage)
+
+    def detect():
+        check, latencies = timed(lambda prompt, response: check_ai_generation(response))
+        _, detections, _ = evaluate_batch(entries, check, args.concurrency)
+        return detections, latencies
+    stage, detections = run_stage("check_ai_generation", len, detect)
+    stages.append(stage)
+
+    completed = [
+        ((prompt, response, result[0]), detection)
+        for (prompt, response), result, detection in zip(entries, results, detections)
+        if result
+    ]
+    evaluations = [evaluation for evaluation, _ in completed]
+    ai_results = [detection for _, detection in completed]
+    stage, _ = run_stage(
+        "report", lambda _: len(evaluations), lambda: (generate_pdf_report(evaluations, ai_results), None)
+    )
+    stages.append(stage)
+
+    return {"format": file_format, "pairs": count, "bytes": len(data), "stages": stages}
+
+def measure_startup(repeat=3):
+    """Best-of-repeat import time in a fresh interpreter for each STARTUP_IMPORTS group, in ms."""
+    startup = {}
+    for name, modules in STARTUP_IMPORTS.items():
+        code = f"import time; start = time.perf_counter(); import {modules}; print(time.perf_counter() - start)"
+        timings = []
+        for _ in range(repeat):
+            output = subprocess.check_output([sys.executable, "-c", code], text=True)
+            timings.append(float(output.split()[-1]))
+        startup[name] = round(min(timings) * 1000, 1)
+    return startup
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_previous(path, settings):
+    previous = None
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                run = json.loads(line)
+                if run["settings"] == settings:
+                    previous = run
+    return previous
+
+def print_run(run, previous):
+    baseline = {}
+    if previous:
+        print(f"Comparing with {previous['commit']} ({previous['timestamp']})")
+        for corpus in previous["corpora"]:
+            for stage in corpus["stages"]:
+                baseline[(corpus["format"], corpus["pairs"], stage["stage"])] = stage
+    for name, ms in run.get("startup", {}).items():
+        before = (previous or {}).get("startup", {}).get(name)
+        print(f"startup {name:<14}{ms:>8} ms" + (f" (was {before} ms)" if before is not None else ""))
+
+    print(f"{'corpus':<12}{'stage':<22}{'items/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>10}{'vs prev':>10}")
+    for corpus in run["corpora"]:
+        for stage in corpus["stages"]:
+            before = baseline.get((corpus["format"], corpus["pairs"], stage["stage"]))
+            change = ""
+            if before and before["seconds"]:
+                change = f"{(stage['seconds'] - before['seconds']) / before['seconds']:+.0%}"
+            print(
+                f"{corpus['format'] + ' ' + str(corpus['pairs']):<12}{stage['stage']:<22}"
+                f"{stage['throughput'] or 0:>10}{stage.get('p50_ms', ''):>10}{stage.get('p99_ms', ''):>10}"
+                f"{stage['peak_mb']:>10}{change:>10}"
+            )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="End-to-end pipeline benchmark against a local fake OpenAI server."
+    )
+    parser.add_argument("--sizes", default="10,100,1000", help="comma-separated pair counts")
+    parser.add_argument("--formats", default="txt,docx,pdf")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server mean latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--pack-max-pairs", type=int, default=1)
+    parser.add_argument("--rpm", type=int, default=1000000, help="client-side request budget per minute")
+    parser.add_argument("--tpm", type=int, default=100000000, help="client-side token budget per minute")
+    parser.add_argument("--detect-ai", action="store_true", help="fuse AI detection into the evaluate stage")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSONL file runs are appended to")
+    parser.add_argument("--no-startup", action="store_true", help="skip the cold import-time measurement")
+    args = parser.parse_args(argv)
+
+    startup = None if args.no_startup else measure_startup()
+
+    server = serve(latency=args.latency, error_rate=args.error_rate, server_error_rate=args.server_error_rate)
+    evaluator._client = openai.OpenAI(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/v1/", api_key="benchmark", max_retries=0
+    )
+    evaluator.rate_limiter = RateLimiter(args.rpm, args.tpm, max_concurrency=args.concurrency)
+
+    settings = {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "server_error_rate": args.server_error_rate,
+        "concurrency": args.concurrency,
+        "rpm": args.rpm,
+        "tpm": args.tpm,
+        "pack_max_pairs": args.pack_max_pairs,
+        "detect_ai": args.detect_ai
+    }
+    run = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": settings,
+        "startup": startup or {},
+        "corpora": [
+            benchmark_corpus(file_format, int(size), args)
+            for file_format in args.formats.split(",")
+            for size in args.sizes.split(",")
+        ]
+    }
+    server.shutdown()
+
+    print_run(run, load_previous(args.results, settings))
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
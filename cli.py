@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import sys
+
+from batch import DEFAULT_CONCURRENCY, iter_pack_evaluations
+from dedup import iter_deduplicated, make_index
+from eval_cache import CACHE_PATH, EvaluationCache
+from export import export_columns, export_row, open_export
+from evaluator import (
+    AI_DETECTION_KEY,
+    ALL_PARAMETERS,
+    CONTENT_PARAMETERS,
+    RAI_PARAMETERS,
+    PACK_MAX_PAIRS,
+    PACK_TOKEN_BUDGET,
+    evaluate_cached_pack,
+    iter_packs,
+    select_parameters,
+)
+from ingest import iter_file_pairs, make_fields
+from usage import UsageMeter, format_usage
+
+FSYNC_EVERY = 100
+
+def iter_input_pairs(path, fields=None, skipped=None):
+    with open(path, "rb") as f:
+        yield from iter_file_pairs(f, fields, skipped)
+
+def parse_param_keys(value):
+    keys = []
+    for name in value.split(","):
+        name = name.strip().lower()
+        if name == "rai":
+            keys.extend(RAI_PARAMETERS)
+        elif name == "content":
+            keys.extend(CONTENT_PARAMETERS)
+        elif name == "all":
+            keys.extend(ALL_PARAMETERS)
+        elif name in ALL_PARAMETERS:
+            keys.append(name)
+        else:
+            raise argparse.ArgumentTypeError(f"unknown parameter: {name}")
+    return list(dict.fromkeys(keys))
+
+def load_checkpoint(path):
+    """Return the input indices already written to a results file.
+
+    A torn or unreadable tail left by a crash is truncated so the run can
+    append after the last complete row.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    good = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(line)["index"])
+            except (ValueError, KeyError):
+                break
+            good += len(line)
+    with open(path, "r+b") as f:
+        f.truncate(good)
+    return done
+
+def export_results(results_path, export_path, param_keys, detect_ai):
+    """Stream a results file into a flat CSV, JSONL or Parquet export in input order.
+
+    Rows are written to the results file as they finish, so only the offset
+    of each row is kept in memory to read them back sorted by index.
+    """
+    offsets = {}
+    with open(results_path, "rb") as f:
+        offset = 0
+        for line in f:
+            offsets[json.loads(line)["index"]] = offset
+            offset += len(line)
+    columns = export_columns(param_keys, detect_ai)
+    writer = open_export(export_path, columns)
+    try:
+        with open(results_path, "rb") as f:
+            for idx in sorted(offsets):
+                f.seek(offsets[idx])
+                row = json.loads(f.readline())
+                writer.write(export_row(
+                    columns, row["index"], row["prompt"], row["response"],
+                    row["evaluation"], row.get(AI_DETECTION_KEY)
+                ))
+    finally:
+        writer.close()
+
+def run(args):
+    param_keys = args.params
+    done = set() if args.restart else load_checkpoint(args.output)
+    fields = make_fields(args.prompt_field, args.response_field, args.messages_field)
+    cache = EvaluationCache(":memory:" if args.no_cache else args.cache)
+    meter = UsageMeter()
+    skipped = [0]
+
+    pending = (
+        (idx, prompt, response)
+        for idx, (prompt, response) in enumerate(iter_input_pairs(args.input, fields, skipped))
+        if idx not in done
+    )
+
+    def evaluate(pack):
+        return evaluate_cached_pack(
+            cache, [(prompt, response) for _, prompt, response in pack], param_keys,
+            detect_ai=args.detect_ai, meter=meter
+        )
+
+    index = make_index(args.dedup)
+    written = failed = 0
+    with open(args.output, "w" if args.restart else "a", encoding="utf-8") as out:
+        for _, (idx, prompt, response), result, error, _ in iter_deduplicated(
+            pending,
+            lambda entries: iter_pack_evaluations(
+                iter_packs(entries, args.pack_tokens, args.pack_max_pairs), evaluate, args.concurrency
+            ),
+            index,
+            number=lambda _, entry: entry[0]
+        ):
+            if error:
+                failed += 1
+                print(f"Evaluation #{idx + 1} failed: {error}", file=sys.stderr)
+                continue
+            evaluation = result[0]
+            row = {
+                "index": idx,
+                "prompt": prompt,
+                "response": response,
+                "evaluation": select_parameters(evaluation, param_keys)
+            }
+            if args.detect_ai:
+                row[AI_DETECTION_KEY] = evaluation.get(AI_DETECTION_KEY)
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            out.flush()
+            written += 1
+            if written % FSYNC_EVERY == 0:
+                os.fsync(out.fileno())
+                print(f"{written + len(done)} evaluations written", file=sys.stderr)
+
+    print(
+        f"Done: {written} evaluated, {len(done)} resumed from checkpoint, {failed} failed, "
+        f"{skipped[0]} malformed lines skipped (cache hit rate {cache.stats()['hit_rate']:.0%})",
+        file=sys.stderr
+    )
+    if index:
+        print(f"Reused results for {index.exact} exact and {index.similar} near duplicates", file=sys.stderr)
+    print(f"Token usage: {format_usage(meter.totals())}", file=sys.stderr)
+    if args.export:
+        export_results(args.output, args.export, param_keys, args.detect_ai)
+    return 1 if failed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate prompt/response pairs against RAI and content parameters."
+    )
+    parser.add_argument("input", help="JSONL, CSV, PDF, DOCX or TXT file of prompt/response pairs or chat logs")
+    parser.add_argument("output", help="JSONL results file; rerunning resumes after the rows already in it")
+    parser.add_argument("--params", type=parse_param_keys, default=parse_param_keys("rai"),
+                        help="comma-separated parameter keys, or rai, content, all (default: rai)")
+    parser.add_argument("--detect-ai", action="store_true", help="also check if responses are AI-generated")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--pack-tokens", type=int, default=PACK_TOKEN_BUDGET,
+                        help="estimated prompt+response tokens per packed request")
+    parser.add_argument("--pack-max-pairs", type=int, default=PACK_MAX_PAIRS,
+                        help="most pairs per request; 1 disables packing")
+    parser.add_argument("--prompt-field", default="prompt",
+                        help="JSONL key or CSV column of the prompt; dotted paths reach nested keys")
+    parser.add_argument("--response-field", default="response",
+                        help="JSONL key or CSV column of the response")
+    parser.add_argument("--messages-field", default="messages",
+                        help="JSONL key of an OpenAI-style messages list; each user turn and the "
+                             "assistant reply after it become one pair")
+    parser.add_argument("--dedup", choices=["off", "exact", "near"], default="exact",
+                        help="evaluate each group of duplicate pairs once; near also matches "
+                             "near-duplicates by MinHash similarity (default: exact)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="SQLite evaluation cache file")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--export", help="also write a flat .csv, .jsonl or .parquet export of all results")
+    parser.add_argument("--restart", action="store_true", help="ignore and overwrite existing results")
+    args = parser.parse_args(argv)
+    if args.dedup == "off":
+        args.dedup = None
+    return run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
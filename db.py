@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, MongoClient, monitoring
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+load_dotenv()
+
+DATABASE_NAME = "auth_system"
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000))
+INDEX_RETRY_SECONDS = 30
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_DAYS", 30)) * 24 * 3600
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+_indexes_ready = False
+_indexes_attempted_at = None
+
+INDEXES = {
+    "pending_users": [
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+        ([("email", ASCENDING), ("verification_token", ASCENDING)], {"name": "email_token"}),
+        # token_expiry holds the deletion time itself, so documents expire as soon as it passes
+        ([("token_expiry", ASCENDING)], {"name": "token_expiry_ttl", "expireAfterSeconds": 0})
+    ],
+    "verified_users": [
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True})
+    ],
+    "email_outbox": [
+        ([("status", ASCENDING), ("next_attempt_at", ASCENDING)], {"name": "status_next_attempt"}),
+        # delivered messages are kept for a week; pending and failed ones have no sent_at
+        ([("sent_at", ASCENDING)], {"name": "sent_at_ttl", "expireAfterSeconds": 7 * 24 * 3600})
+    ],
+    "evaluations": [
+        ([("user_email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {"name": "user_created"}),
+        (
+            [("user_email", ASCENDING), ("verdicts", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            {"name": "user_verdict_created"}
+        )
+    ],
+    "evaluation_jobs": [
+        ([("status", ASCENDING), ("created_at", ASCENDING)], {"name": "status_created"}),
+        ([("user_email", ASCENDING), ("created_at", DESCENDING)], {"name": "user_created"}),
+        # finished, failed and cancelled jobs expire; queued and running ones have no finished_at
+        ([("finished_at", ASCENDING)], {"name": "finished_at_ttl", "expireAfterSeconds": JOB_RETENTION_SECONDS})
+    ],
+    "evaluation_job_results": [
+        ([("job_id", ASCENDING), ("index", ASCENDING)], {"name": "job_index_unique", "unique": True}),
+        ([("written_at", ASCENDING)], {"name": "written_at_ttl", "expireAfterSeconds": JOB_RETENTION_SECONDS})
+    ]
+}
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so the pool size can be tuned."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.cleared = 0
+        self.max_wait_ms = 0.0
+        self._wait_ms = 0.0
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count("cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count("created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count("closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._count("checkout_failures")
+
+    def connection_checked_out(self, event):
+        # duration is reported by pymongo 4.7 and later
+        wait_ms = (getattr(event, "duration", None) or 0) * 1000
+        with self._lock:
+            self.checked_out += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self._wait_ms += wait_ms
+
+    def connection_checked_in(self, event):
+        self._count("in_use", -1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_pool_size": MAX_POOL_SIZE,
+                "open": self.created - self.closed,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "created": self.created,
+                "checked_out": self.checked_out,
+                "checkout_failures": self.checkout_failures,
+                "cleared": self.cleared,
+                "avg_wait_ms": round(self._wait_ms / self.checked_out, 2) if self.checked_out else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 2)
+            }
+
+pool_metrics = PoolMetrics()
+
+def get_client():
+    """Create the MongoClient on first use and share its connection pool across sessions and pages"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # MongoClient connects lazily; the first round trip is ensure_indexes in get_database
+                _client = MongoClient(
+                    os.getenv("MONGO_URI"),
+                    maxPoolSize=MAX_POOL_SIZE,
+                    minPoolSize=MIN_POOL_SIZE,
+                    maxIdleTimeMS=MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=WAIT_QUEUE_TIMEOUT_MS,
+                    connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                    socketTimeoutMS=SOCKET_TIMEOUT_MS,
+                    # TTL indexes compare against UTC, so datetimes are stored and read back as aware UTC
+                    tz_aware=True,
+                    event_listeners=[pool_metrics]
+                )
+    return _client
+
+def ensure_indexes(db):
+    """Create the lookup, uniqueness and TTL indexes; create_index is a no-op for existing ones.
+
+    Returns False if MongoDB could not be reached, so the caller can try again.
+    """
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+            except ConnectionFailure as e:
+                logger.warning("Could not reach MongoDB to create indexes: %s", e)
+                return False
+            except PyMongoError as e:
+                logger.warning("Could not create index %s on %s: %s", options["name"], collection, e)
+    return True
+
+def get_database():
+    """The shared database handle.
+
+    The first call in a process creates the indexes synchronously, so it
+    waits for MongoDB (up to the server selection timeout). If MongoDB was
+    unreachable, a later call tries again once INDEX_RETRY_SECONDS have passed.
+    """
+    global _indexes_ready, _indexes_attempted_at
+    db = get_client()[DATABASE_NAME]
+    if not _indexes_ready:
+        with _client_lock:
+            now = time.monotonic()
+            if not _indexes_ready and (
+                _indexes_attempted_at is None or now - _indexes_attempted_at >= INDEX_RETRY_SECONDS
+            ):
+                _indexes_attempted_at = now
+                _indexes_ready = ensure_indexes(db)
+    return db
+
+def pool_stats():
+    return pool_metrics.stats()
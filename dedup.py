@@ -0,0 +1,202 @@
+import hashlib
+import os
+import random
+import re
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from itertools import count
+
+from parameters import REUSED_KEY
+
+NEAR_THRESHOLD = float(os.getenv("DEDUP_NEAR_THRESHOLD", 0.9))
+RESULT_MEMORY = int(os.getenv("DEDUP_RESULT_MEMORY", 10000))
+HELD_DUPLICATES = int(os.getenv("DEDUP_HELD_DUPLICATES", 100))
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_WORDS = 3
+MASK = (1 << 64) - 1
+
+# fixed seed so signatures are comparable across runs and processes
+_rng = random.Random(0x5EED)
+PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERM)]
+
+def normalize(text):
+    """Case-fold, NFKC-normalize and collapse whitespace so trivially different copies compare equal"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+def pair_hash(prompt, response):
+    return hashlib.blake2b(
+        f"{normalize(prompt)}\0{normalize(response)}".encode("utf-8"), digest_size=16
+    ).digest()
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+def shingles(text, size=SHINGLE_WORDS):
+    words = re.findall(r"\w+", text)
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[n:n + size]) for n in range(len(words) - size + 1)}
+
+def minhash(text):
+    hashes = [_hash64(shingle) for shingle in shingles(text)]
+    return array("Q", (min((a * h + b) & MASK for h in hashes) for a, b in PERMUTATIONS))
+
+def similarity(first, second):
+    """Jaccard similarity estimated from two MinHash signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+class DuplicateIndex:
+    """Maps each (prompt, response) pair to the first earlier pair it duplicates.
+
+    Pairs are equal when they match after normalize(). With near=True, a
+    MinHash/LSH index over word shingles of the normalized pair also catches
+    near-duplicates whose estimated Jaccard similarity is at least threshold.
+    Memory grows with the number of distinct pairs: a 16-byte hash each, plus
+    a 512-byte signature when near-duplicate detection is on.
+    """
+
+    def __init__(self, near=False, threshold=NEAR_THRESHOLD, bands=BANDS):
+        self.near = near
+        self.threshold = threshold
+        self.bands = bands
+        self.exact = 0
+        self.similar = 0
+        self._hashes = {}
+        self._buckets = {}
+        self._signatures = {}
+
+    def add(self, idx, prompt, response):
+        """Return the index of the pair idx duplicates, or None after registering it as distinct"""
+        key = pair_hash(prompt, response)
+        original = self._hashes.get(key)
+        if original is not None:
+            self.exact += 1
+            return original
+        self._hashes[key] = idx
+        if not self.near:
+            return None
+
+        signature = minhash(f"{normalize(prompt)}\n{normalize(response)}")
+        rows = NUM_PERM // self.bands
+        bands = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+        for band in bands:
+            for candidate in self._buckets.get(band, ()):
+                if similarity(signature, self._signatures[candidate]) >= self.threshold:
+                    self.similar += 1
+                    self._hashes[key] = candidate
+                    return candidate
+        for band in bands:
+            self._buckets.setdefault(band, []).append(idx)
+        self._signatures[idx] = signature
+        return None
+
+def make_index(mode):
+    """A DuplicateIndex for mode "exact" or "near", or None when deduplication is off"""
+    return DuplicateIndex(near=mode == "near") if mode else None
+
+def reused_result(result, number):
+    """An evaluate_cached result fanned out to a duplicate of entry number, with every verdict reused"""
+    evaluation, reused, requested = result
+    return {**evaluation, REUSED_KEY: number}, reused + requested, 0
+
+def iter_deduplicated(entries, evaluate_stream, index, memory=RESULT_MEMORY, number=None, held=HELD_DUPLICATES):
+    """Evaluate only the first of each group of duplicate entries and fan its result out.
+
+    entries end in (prompt, response); evaluate_stream(unique_entries) yields
+    (index, entry, result, error, read) events of evaluate_cached results,
+    like batch.iter_pack_evaluations. The same events are yielded for every
+    entry, with indices and read counted over all entries; a duplicate's
+    result comes from reused_result, with the original's input index given
+    by number(index, entry) (index by default). With index None entries pass
+    straight through. Successful results are remembered for the last `memory`
+    distinct entries; a duplicate of an older one is evaluated again. When an
+    original fails, its first waiting duplicate is evaluated in its place and
+    the others wait on that.
+
+    Once `held` duplicates wait for their results, reading stops until the
+    unique entries in flight finish and the duplicates are yielded, so a long
+    run of copies neither piles up in memory nor stalls the results.
+    """
+    if index is None:
+        yield from evaluate_stream(entries)
+        return
+    number = number or (lambda idx, entry: idx)
+
+    source = enumerate(entries)
+    waiting = {}
+    finished = OrderedDict()
+    ready = deque()
+    retry = deque()
+    # an original that failed or was forgotten -> the later entry evaluated in its place
+    replaced = {}
+    read = [0]
+    holding = [0]
+    exhausted = [False]
+
+    def unique_entries():
+        while True:
+            while retry:
+                yield retry.popleft()
+            if holding[0] >= held:
+                return
+            item = next(source, None)
+            if item is None:
+                exhausted[0] = True
+                return
+            idx, entry = item
+            read[0] = idx + 1
+            original = index.add(idx, entry[-2], entry[-1])
+            while original in replaced:
+                original = replaced[original]
+            if original is None or (original not in waiting and original not in finished):
+                if original is not None:
+                    replaced[original] = idx
+                waiting[idx] = []
+                yield idx, entry
+                continue
+            holding[0] += 1
+            if original in finished:
+                finished.move_to_end(original)
+                ready.append((idx, entry, reused_result(*finished[original])))
+            else:
+                waiting[original].append((idx, entry))
+
+    def submit(pending, positions):
+        unique = count()
+        for idx, entry in pending:
+            positions[next(unique)] = idx
+            yield entry
+
+    def drain():
+        while ready:
+            idx, entry, result = ready.popleft()
+            holding[0] -= 1
+            yield idx, entry, result, None, read[0]
+
+    while True:
+        positions = {}
+        for position, entry, result, error, _ in evaluate_stream(submit(unique_entries(), positions)):
+            idx = positions.pop(position)
+            yield idx, entry, result, error, read[0]
+            duplicates = waiting.pop(idx)
+            if error is None:
+                original = number(idx, entry)
+                for duplicate, duplicate_entry in duplicates:
+                    holding[0] -= 1
+                    yield duplicate, duplicate_entry, reused_result(result, original), None, read[0]
+                finished[idx] = (result, original)
+                if len(finished) > memory:
+                    finished.popitem(last=False)
+            elif duplicates:
+                holding[0] -= 1
+                replaced[idx] = duplicates[0][0]
+                waiting[duplicates[0][0]] = duplicates[1:]
+                retry.append(duplicates[0])
+            yield from drain()
+        yield from drain()
+        # a round ends when the input runs out or too many duplicates are held;
+        # the next one evaluates failed originals' duplicates and reads on
+        if exhausted[0] and not retry:
+            return
@@ -0,0 +1,46 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = int(os.getenv("DOCUMENT_CACHE_MB", 256)) * 1024 * 1024
+
+def document_key(name, data, fields=None):
+    extension = name.split('.')[-1].lower()
+    key = f"{extension}:{hashlib.sha256(data).hexdigest()}"
+    if fields:
+        key += ":" + ",".join(f"{field}={path}" for field, path in sorted(fields.items()))
+    return key
+
+class DocumentCache:
+    """LRU of parsed upload entries keyed on content hash, bounded by total text size."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        size = sum(len(prompt) + len(response) for prompt, response in value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.size -= self._items.pop(key)[1]
+            self._items[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.size -= self._items.popitem(last=False)[1][1]
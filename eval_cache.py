@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = os.getenv("EVAL_CACHE_PATH", "evaluation_cache.sqlite3")
+MEMORY_ENTRIES = int(os.getenv("EVAL_CACHE_MEMORY_ENTRIES", 1024))
+MAX_ENTRIES = int(os.getenv("EVAL_CACHE_MAX_ENTRIES", 100000))
+TTL_SECONDS = float(os.getenv("EVAL_CACHE_TTL_HOURS", 24 * 30)) * 3600
+
+def make_cache_key(prompt, response, param_key, model, prompt_version):
+    payload = json.dumps(
+        [prompt, response, param_key, model, prompt_version],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class EvaluationCache:
+    """Two-tier cache: an in-process LRU in front of a SQLite file."""
+
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES,
+                 max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        # memory hits not yet written to accessed_at, so eviction does not drop the hottest keys
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS evaluations (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS evaluations_accessed_at ON evaluations (accessed_at)")
+        self._db.commit()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, key):
+        """Return (value, tier) where tier is 'memory', 'disk' or None on a miss."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and now - cached[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self._touched[key] = now
+                if len(self._touched) >= self.memory_entries:
+                    self._write_touched()
+                    self._db.commit()
+                self.hits_memory += 1
+                return cached[0], "memory"
+            if cached:
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, created_at FROM evaluations WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] < self.ttl:
+                self._db.execute("UPDATE evaluations SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.hits_disk += 1
+                return value, "disk"
+            if row:
+                self._db.execute("DELETE FROM evaluations WHERE key = ?", (key,))
+                self._db.commit()
+
+            self.misses += 1
+            return None, None
+
+    def lookup_many(self, keys):
+        """Return {key: (value, tier)} for every key that is cached."""
+        return {
+            key: (value, tier)
+            for key, (value, tier) in ((key, self.lookup(key)) for key in keys)
+            if tier
+        }
+
+    def get(self, key):
+        return self.lookup(key)[0]
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value, now)
+                self._touched.pop(key, None)
+            self._write_touched()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO evaluations (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False), now, now) for key, value in items.items()]
+            )
+            previous = self._writes
+            self._writes += len(items)
+            if self._writes // 100 > previous // 100:
+                self._evict(now)
+            self._db.commit()
+
+    def _write_touched(self):
+        if self._touched:
+            self._db.executemany(
+                "UPDATE evaluations SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self, now):
+        self._db.execute("DELETE FROM evaluations WHERE created_at < ?", (now - self.ttl,))
+        overflow = self._db.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM evaluations WHERE key IN "
+                "(SELECT key FROM evaluations ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0
+            }
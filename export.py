@@ -0,0 +1,113 @@
+import csv
+import json
+
+AI_COLUMNS = ["ai_is_generated", "ai_confidence", "ai_reason"]
+ROW_GROUP_SIZE = 10000
+
+def export_columns(param_keys, detect_ai=False):
+    columns = ["index", "prompt", "response"]
+    for param in param_keys:
+        columns.extend([param, f"{param}_reason"])
+    if detect_ai:
+        columns.extend(AI_COLUMNS)
+    columns.append("reused_from")
+    return columns
+
+def _number(value):
+    try:
+        return float(str(value).rstrip('%'))
+    except (TypeError, ValueError):
+        return None
+
+def export_row(columns, index, prompt, response, evaluation, ai_result=None):
+    """One export row for the entry at 0-based input index; exports number entries from 1"""
+    values = dict(evaluation)
+    values.update(index=index + 1, prompt=prompt, response=response)
+    if evaluation.get("reused_from") is not None:
+        values["reused_from"] = evaluation["reused_from"] + 1
+    ai_result = ai_result or evaluation.get("ai_generation") or {}
+    is_ai_generated = ai_result.get("is_ai_generated")
+    values.update(
+        ai_is_generated=is_ai_generated if isinstance(is_ai_generated, bool) else None,
+        ai_confidence=_number(ai_result.get("confidence")),
+        ai_reason=ai_result.get("reason")
+    )
+    return [values.get(column) for column in columns]
+
+class CsvExportWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+class JsonlExportWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", encoding="utf-8")
+        self.columns = columns
+
+    def write(self, row):
+        self.file.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+class ParquetExportWriter:
+    """Buffers rows column-wise and writes a Parquet row group every ROW_GROUP_SIZE rows."""
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+        self.pyarrow = pyarrow
+        self.columns = columns
+        fields = []
+        for column in columns:
+            if column == "index":
+                fields.append(pyarrow.field(column, pyarrow.int64()))
+            elif column == "ai_is_generated":
+                fields.append(pyarrow.field(column, pyarrow.bool_()))
+            elif column == "ai_confidence":
+                fields.append(pyarrow.field(column, pyarrow.float64()))
+            else:
+                fields.append(pyarrow.field(column, pyarrow.string()))
+        self.schema = pyarrow.schema(fields)
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self._buffer = [[] for _ in columns]
+
+    def write(self, row):
+        for values, value in zip(self._buffer, row):
+            values.append(value)
+        if len(self._buffer[0]) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._buffer[0]:
+            self.writer.write_table(self.pyarrow.Table.from_arrays(
+                [self.pyarrow.array(values, type=field.type) for values, field in zip(self._buffer, self.schema)],
+                schema=self.schema
+            ))
+            self._buffer = [[] for _ in self.columns]
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+EXPORT_WRITERS = {
+    "csv": CsvExportWriter,
+    "jsonl": JsonlExportWriter,
+    "parquet": ParquetExportWriter
+}
+
+def open_export(path, columns):
+    extension = path.split('.')[-1].lower()
+    if extension not in EXPORT_WRITERS:
+        raise ValueError(f"Unsupported export format '{extension}'. Use one of: {', '.join(EXPORT_WRITERS)}.")
+    return EXPORT_WRITERS[extension](path, columns)
@@ -0,0 +1,160 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions endpoint that answers evaluation prompts.
+
+    Latency and 429/500 injection are read from the server's settings.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        settings = self.server.settings
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        with self.server.lock:
+            self.server.requests += 1
+        started = time.perf_counter()
+        time.sleep(max(0.0, random.gauss(settings.latency, settings.latency * settings.jitter)))
+
+        roll = random.random()
+        if roll < settings.error_rate:
+            with self.server.lock:
+                self.server.throttled += 1
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {
+                "retry-after-ms": str(int(settings.retry_after * 1000)),
+                "x-ratelimit-remaining-requests": "0"
+            })
+            return
+        if roll < settings.error_rate + settings.server_error_rate:
+            self._send(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            return
+
+        messages = request.get("messages", [])
+        content = "\n".join(str(message.get("content", "")) for message in messages)
+        answer = json.dumps(fake_answer(str(messages[-1].get("content", "")) if messages else ""))
+        prompt_tokens = len(content) // 4 + 1
+        completion_tokens = len(answer) // 4 + 1
+        # a rough model of prefix caching: a system message seen before counts as cached,
+        # ignoring the provider's minimum prefix length
+        system = "".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        with self.server.lock:
+            cached_tokens = len(system) // 4 if system in self.server.prefixes else 0
+            self.server.prefixes.add(system)
+        self._send(200, {
+            "id": f"chatcmpl-fake-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}
+            }
+        }, {
+            "openai-processing-ms": str(round((time.perf_counter() - started) * 1000)),
+            "x-ratelimit-limit-requests": "10000",
+            "x-ratelimit-remaining-requests": "9999",
+            "x-ratelimit-remaining-tokens": "10000000"
+        })
+
+def _requested_parameters(content):
+    match = re.search(r"Evaluate these parameters[^:]*:\s*(.*)", content)
+    if not match or match.group(1).strip() == "none":
+        return []
+    return [
+        label.strip().lower().replace("-", "_").replace(" ", "_")
+        for label in match.group(1).split(",")
+        if label.strip()
+    ]
+
+def _verdicts(params, detect_ai):
+    evaluation = {}
+    for param in params:
+        evaluation[param] = random.choice("YN")
+        evaluation[f"{param}_reason"] = f"Synthetic verdict for {param}."
+    if detect_ai:
+        evaluation["ai_generation"] = {
+            "is_ai_generated": random.random() < 0.5,
+            "confidence": random.randint(0, 100),
+            "reason": "Synthetic detection result."
+        }
+    return evaluation
+
+def fake_answer(content):
+    """Answer the per-call request that follows the evaluator's system prompt"""
+    params = _requested_parameters(content)
+    detect_ai = "AI detection: yes" in content
+    interactions = re.findall(r"## Interaction (\d+)", content)
+    if interactions:
+        return {number: _verdicts(params, detect_ai) for number in interactions}
+    return _verdicts(params, detect_ai)
+
+def serve(host="127.0.0.1", port=0, latency=0.0, jitter=0.2, error_rate=0.0, server_error_rate=0.0,
+          retry_after=0.1):
+    """Start the fake server on a background thread; the caller shuts it down."""
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.settings = argparse.Namespace(
+        latency=latency, jitter=jitter, error_rate=error_rate,
+        server_error_rate=server_error_rate, retry_after=retry_after
+    )
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.throttled = 0
+    server.prefixes = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Local OpenAI-compatible stand-in. Point the app at it with "
+                    "OPENAI_BASE_URL=http://HOST:PORT/v1."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="mean seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency standard deviation as a fraction of the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="fraction answered with 500")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="seconds sent in retry-after-ms on 429")
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                   args.server_error_rate, args.retry_after)
+    print(f"Fake OpenAI server on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import random
+import threading
+
+class CollectingHandler:
+    """aiosmtpd handler that keeps delivered messages and can reject a fraction of them.
+
+    Rejections use fail_code: 451 is a temporary failure, a 5xx code a permanent one.
+    """
+
+    def __init__(self, fail_rate=0.0, fail_code=451):
+        self.fail_rate = fail_rate
+        self.fail_code = fail_code
+        self.lock = threading.Lock()
+        self.messages = []
+        self.sessions = 0
+        self.rejected = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        with self.lock:
+            self.sessions += 1
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if random.random() < self.fail_rate:
+            with self.lock:
+                self.rejected += 1
+            return f"{self.fail_code} Injected failure"
+        with self.lock:
+            self.messages.append((envelope.mail_from, list(envelope.rcpt_tos), envelope.content))
+        return "250 OK"
+
+def serve(host="127.0.0.1", port=8025, fail_rate=0.0, fail_code=451):
+    """Start a local SMTP server without TLS or auth; run the app with EMAIL_STARTTLS=0 against it."""
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError as e:
+        raise ImportError("The SMTP stand-in needs aiosmtpd: pip install aiosmtpd") from e
+    handler = CollectingHandler(fail_rate, fail_code)
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+    return controller
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Local SMTP stand-in. Point the app at it with EMAIL_HOST=HOST EMAIL_PORT=PORT EMAIL_STARTTLS=0."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of messages rejected")
+    parser.add_argument("--fail-code", type=int, default=451, help="SMTP reply code of a rejection")
+    args = parser.parse_args(argv)
+    controller = serve(args.host, args.port, args.fail_rate, args.fail_code)
+    print(f"Fake SMTP server on {args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        handler = controller.handler
+        print(f"{len(handler.messages)} messages over {handler.sessions} sessions, {handler.rejected} rejected")
+        controller.stop()
+
+if __name__ == "__main__":
+    main()
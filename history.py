@@ -0,0 +1,151 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+from db import get_database
+from usage import usage_summary
+
+HISTORY_COLLECTION = "evaluations"
+USAGE_COLLECTION = "usage"
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 100))
+PAGE_SIZE = 25
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+logger = logging.getLogger(__name__)
+
+def get_history():
+    return get_database()[HISTORY_COLLECTION]
+
+def history_document(user_email, prompt, response, evaluation, param_keys, batch_id=None, source=None):
+    """One stored evaluation; verdicts holds 'param:Y'/'param:N' strings so verdict filters can use an index"""
+    verdicts = []
+    results = {}
+    for param in param_keys:
+        if param in evaluation:
+            verdicts.append(f"{param}:{evaluation[param]}")
+            results[param] = evaluation[param]
+            results[f"{param}_reason"] = evaluation.get(f"{param}_reason")
+    document = {
+        "user_email": user_email,
+        "created_at": datetime.now(timezone.utc),
+        "prompt": prompt,
+        "response": response,
+        "evaluation": results,
+        "verdicts": verdicts,
+        "batch_id": batch_id,
+        "source": source
+    }
+    if evaluation.get("ai_generation"):
+        document["ai_generation"] = evaluation["ai_generation"]
+    return document
+
+def record_usage(user_email, usage, batch_id=None):
+    """Add a usage delta to the running totals of the user and, if given, the batch"""
+    if not usage.get("calls"):
+        return
+    now = datetime.now(timezone.utc)
+    updates = [UpdateOne(
+        {"_id": f"user:{user_email}"}, {"$inc": usage, "$set": {"updated_at": now}}, upsert=True
+    )]
+    if batch_id is not None:
+        updates.append(UpdateOne(
+            {"_id": f"batch:{batch_id}"},
+            {"$inc": usage, "$set": {"user_email": user_email, "updated_at": now}},
+            upsert=True
+        ))
+    try:
+        get_database()[USAGE_COLLECTION].bulk_write(updates, ordered=False)
+    except PyMongoError as e:
+        logger.warning("Could not store token usage: %s", e)
+
+def get_usage(user_email=None, batch_id=None):
+    """Usage totals with averages for a user or a batch"""
+    key = f"batch:{batch_id}" if batch_id is not None else f"user:{user_email}"
+    return usage_summary(get_database()[USAGE_COLLECTION].find_one({"_id": key}) or {})
+
+class HistoryWriter:
+    """Buffers evaluations and stores them with insert_many every HISTORY_BATCH_SIZE documents.
+
+    If a UsageMeter is given, each flush also adds the usage recorded since
+    the last one to the user's and the batch's totals. Storage errors are
+    logged and counted rather than raised so a database outage never
+    interrupts an evaluation run.
+    """
+
+    def __init__(self, user_email, param_keys, source=None, batch_id=None, batch_size=HISTORY_BATCH_SIZE,
+                 meter=None):
+        self.user_email = user_email
+        self.param_keys = param_keys
+        self.source = source
+        self.batch_size = batch_size
+        self.batch_id = batch_id or ObjectId()
+        self.meter = meter
+        self.written = 0
+        self.failed = 0
+        self._buffer = []
+
+    def add(self, prompt, response, evaluation):
+        self._buffer.append(history_document(
+            self.user_email, prompt, response, evaluation, self.param_keys, self.batch_id, self.source
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.meter is not None:
+            record_usage(self.user_email, self.meter.drain(), self.batch_id)
+        if not self._buffer:
+            return
+        documents, self._buffer = self._buffer, []
+        try:
+            get_history().insert_many(documents, ordered=False)
+            self.written += len(documents)
+        except PyMongoError as e:
+            self.failed += len(documents)
+            logger.warning("Could not store %d evaluations: %s", len(documents), e)
+
+    def close(self):
+        self.flush()
+
+def encode_cursor(document):
+    return f"{round(document['created_at'].timestamp() * 1000)}:{document['_id']}"
+
+def decode_cursor(cursor):
+    millis, object_id = cursor.split(":")
+    return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(object_id)
+
+def query_history(user_email, limit=PAGE_SIZE, cursor=None, parameter=None, verdict=None, since=None, until=None):
+    """Return (documents, next_cursor) for one page of a user's history, newest first.
+
+    Pages are keyed on (created_at, _id) instead of skip(), so every page
+    costs the same however deep it is. next_cursor is None on the last page.
+    """
+    query = {"user_email": user_email}
+    if parameter and verdict:
+        query["verdicts"] = f"{parameter}:{verdict}"
+    elif parameter:
+        query["verdicts"] = {"$in": [f"{parameter}:Y", f"{parameter}:N"]}
+    created = {}
+    if since:
+        created["$gte"] = since
+    if until:
+        created["$lt"] = until
+    if created:
+        query["created_at"] = created
+    if cursor:
+        created_at, object_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": object_id}}
+        ]
+    documents = list(
+        get_history().find(query)
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+    return documents[:limit], next_cursor
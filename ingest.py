@@ -0,0 +1,128 @@
+import csv
+import json
+import logging
+
+from evaluator import iter_file_chunks, iter_prompts_responses
+from text_extract import iter_text_chunks
+
+STRUCTURED_EXTENSIONS = ("jsonl", "ndjson", "csv")
+DEFAULT_FIELDS = {"prompt": "prompt", "response": "response", "messages": "messages"}
+
+logger = logging.getLogger(__name__)
+
+def _lookup(row, path):
+    if path in row:
+        return row[path]
+    value = row
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def _message_text(content):
+    if isinstance(content, list):
+        # content parts: [{"type": "text", "text": ...}, {"type": "image_url", ...}]
+        return "\n".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        ).strip()
+    return str(content or "").strip()
+
+def iter_chat_pairs(messages):
+    """Yield (prompt, response) for each user turn answered by an assistant turn"""
+    prompt = None
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        role = message.get("role")
+        text = _message_text(message.get("content"))
+        if role == "user":
+            prompt = text
+        elif role == "assistant" and prompt and text:
+            yield prompt, text
+            prompt = None
+
+def iter_row_pairs(row, fields=DEFAULT_FIELDS):
+    """Yield the pairs in one structured row.
+
+    Fields are dotted paths into nested JSON objects ("request.input").
+    A row that carries a messages list is read as an OpenAI-style chat log
+    instead of through the prompt and response fields.
+    """
+    messages = _lookup(row, fields["messages"]) if fields.get("messages") else None
+    if isinstance(messages, list):
+        yield from iter_chat_pairs(messages)
+        return
+    prompt, response = _lookup(row, fields["prompt"]), _lookup(row, fields["response"])
+    if prompt is not None and response is not None:
+        yield str(prompt).strip(), str(response).strip()
+
+def iter_lines(file):
+    """Decode a binary file and yield it line by line with line endings kept"""
+    partial = []
+    for chunk in iter_text_chunks(file):
+        # not splitlines(): JSON strings may hold U+2028 and other breaks unescaped
+        start = 0
+        while start < len(chunk):
+            end = chunk.find("\n", start) + 1
+            if not end:
+                # a line longer than one chunk continues in the next
+                partial.append(chunk[start:])
+                break
+            partial.append(chunk[start:end])
+            yield "".join(partial)
+            partial = []
+            start = end
+    if partial:
+        yield "".join(partial)
+
+def iter_jsonl_pairs(file, fields=DEFAULT_FIELDS, skipped=None):
+    """Yield the pairs of each JSON object line.
+
+    Other lines are logged with their line number and skipped, so one bad
+    row does not stop a long export; skipped[0] counts them when given.
+    """
+    for number, line in enumerate(iter_lines(file), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            problem = f"not valid JSON: {e}"
+        else:
+            if isinstance(row, dict):
+                yield from iter_row_pairs(row, fields)
+                continue
+            problem = "not a JSON object"
+        logger.warning("Skipping line %d: %s", number, problem)
+        if skipped is not None:
+            skipped[0] += 1
+
+def iter_csv_pairs(file, fields=DEFAULT_FIELDS):
+    rows = csv.DictReader(iter_lines(file))
+    missing = [name for name in (fields["prompt"], fields["response"]) if name not in (rows.fieldnames or ())]
+    if missing:
+        raise ValueError(f"CSV file has no column named {', '.join(missing)}")
+    for row in rows:
+        yield from iter_row_pairs(row, fields)
+
+def make_fields(prompt=None, response=None, messages=None):
+    """Build a field mapping, falling back to the default name for anything left blank"""
+    given = {"prompt": prompt, "response": response, "messages": messages}
+    return {name: given[name] or default for name, default in DEFAULT_FIELDS.items()}
+
+def iter_file_pairs(file, fields=None, skipped=None):
+    """Yield (prompt, response) pairs from an upload or open binary file, row by row.
+
+    JSONL and CSV files are read through the field mapping; PDF, DOCX and
+    TXT documents are parsed for Prompt:/Response: markers. Malformed JSONL
+    lines are counted in skipped[0].
+    """
+    fields = fields or DEFAULT_FIELDS
+    extension = file.name.split('.')[-1].lower()
+    if extension in ("jsonl", "ndjson"):
+        return iter_jsonl_pairs(file, fields, skipped)
+    if extension == "csv":
+        return iter_csv_pairs(file, fields)
+    return iter_prompts_responses(iter_file_chunks(file))
@@ -0,0 +1,291 @@
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import gridfs
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from batch import DEFAULT_CONCURRENCY, iter_pack_evaluations
+from db import get_database
+from dedup import iter_deduplicated, make_index
+from eval_cache import EvaluationCache
+from evaluator import (
+    AI_DETECTION_KEY,
+    evaluate_cached_pack,
+    iter_packs,
+    select_parameters,
+)
+from history import HistoryWriter, record_usage
+from ingest import iter_file_pairs
+from usage import UsageMeter
+
+JOBS_COLLECTION = "evaluation_jobs"
+RESULTS_COLLECTION = "evaluation_job_results"
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 60))
+POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 2))
+FLUSH_ROWS = 50
+FLUSH_SECONDS = 2
+
+logger = logging.getLogger(__name__)
+
+class JobLost(Exception):
+    """The job was cancelled or its lease was taken over by another worker."""
+
+def submit_job(user_email, file_name, data, param_keys, detect_ai=False, fields=None, dedup="exact"):
+    """Store the upload in GridFS and queue an evaluation job for it; returns the job id"""
+    db = get_database()
+    file_id = gridfs.GridFS(db).put(data, filename=file_name)
+    now = datetime.now(timezone.utc)
+    return db[JOBS_COLLECTION].insert_one({
+        "user_email": user_email,
+        "source": file_name,
+        "file_id": file_id,
+        "param_keys": list(param_keys),
+        "detect_ai": detect_ai,
+        "fields": fields,
+        "dedup": dedup,
+        "status": "queued",
+        "created_at": now,
+        "read": 0,
+        "done": 0,
+        "failed": 0,
+        "skipped": 0,
+        "total": None
+    }).inserted_id
+
+def get_job(job_id):
+    return get_database()[JOBS_COLLECTION].find_one({"_id": job_id})
+
+def list_jobs(user_email, limit=10):
+    return list(
+        get_database()[JOBS_COLLECTION].find({"user_email": user_email})
+        .sort("created_at", DESCENDING).limit(limit)
+    )
+
+def delete_input(db, job):
+    """Remove a finished job's upload from GridFS; results stay until their TTL"""
+    try:
+        gridfs.GridFS(db).delete(job["file_id"])
+    except PyMongoError as e:
+        logger.warning("Could not delete the input of job %s: %s", job["_id"], e)
+
+def cancel_job(job_id, user_email):
+    db = get_database()
+    job = db[JOBS_COLLECTION].find_one_and_update(
+        {"_id": job_id, "user_email": user_email, "status": {"$in": ["queued", "running"]}},
+        {"$set": {"status": "cancelled", "finished_at": datetime.now(timezone.utc)}}
+    )
+    # a running job's worker deletes the input once it notices the cancellation
+    if job and job["status"] == "queued":
+        delete_input(db, job)
+
+def iter_job_results(job_id, after=-1, limit=0):
+    """Per-entry results of a job in input order, starting after entry index `after`"""
+    return get_database()[RESULTS_COLLECTION].find(
+        {"job_id": job_id, "index": {"$gt": after}}
+    ).sort("index", ASCENDING).limit(limit)
+
+def claim_job(jobs, worker):
+    """Atomically take the oldest queued job, or a running one whose worker stopped renewing its lease."""
+    now = datetime.now(timezone.utc)
+    return jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$lt": now}}
+        ]},
+        {
+            "$set": {"status": "running", "worker": worker, "lease_until": now + timedelta(seconds=LEASE_SECONDS)},
+            "$min": {"started_at": now}
+        },
+        sort=[("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def _heartbeat(jobs, job_id, worker, stop, lost):
+    while not stop.wait(LEASE_SECONDS / 3):
+        try:
+            renewed = jobs.update_one(
+                {"_id": job_id, "worker": worker, "status": "running"},
+                {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=LEASE_SECONDS)}}
+            )
+        except PyMongoError as e:
+            logger.warning("Could not renew lease on job %s: %s", job_id, e)
+            continue
+        if not renewed.matched_count:
+            lost.set()
+            return
+
+def run_job(db, job, worker, concurrency=DEFAULT_CONCURRENCY):
+    """Evaluate a claimed job, resuming after the entries a previous worker already stored."""
+    jobs, results = db[JOBS_COLLECTION], db[RESULTS_COLLECTION]
+    job_id = job["_id"]
+    param_keys = job["param_keys"]
+    done = set()
+
+    stop = threading.Event()
+    lost = threading.Event()
+    threading.Thread(target=_heartbeat, args=(jobs, job_id, worker, stop, lost), daemon=True).start()
+
+    meter = UsageMeter()
+    history = HistoryWriter(job["user_email"], param_keys, source=job["source"], batch_id=job_id)
+    buffer = []
+    counts = {"done": 0, "failed": 0}
+    read = [0]
+    skipped = [0]
+    flushed_at = time.monotonic()
+
+    def flush():
+        if buffer:
+            results.bulk_write([
+                ReplaceOne({"job_id": job_id, "index": row["index"]}, row, upsert=True) for row in buffer
+            ], ordered=False)
+            history.flush()
+        usage = meter.drain()
+        record_usage(job["user_email"], usage)
+        updated = jobs.update_one(
+            {"_id": job_id, "worker": worker, "status": "running"},
+            {"$set": {"read": read[0], "skipped": skipped[0]}, "$inc": {**counts, **{f"usage.{k}": v for k, v in usage.items()}}}
+        )
+        buffer.clear()
+        counts.update(done=0, failed=0)
+        if not updated.matched_count:
+            raise JobLost(job_id)
+
+    def pending():
+        file = io.BytesIO(gridfs.GridFS(db).get(job["file_id"]).read())
+        file.name = job["source"]
+        for idx, (prompt, response) in enumerate(iter_file_pairs(file, job.get("fields"), skipped)):
+            read[0] = idx + 1
+            if idx not in done:
+                yield idx, prompt, response
+
+    def evaluate(pack):
+        return evaluate_cached_pack(
+            cache, [(prompt, response) for _, prompt, response in pack], param_keys,
+            detect_ai=job["detect_ai"], meter=meter
+        )
+
+    try:
+        done.update(
+            row["index"]
+            for row in results.find({"job_id": job_id, "error": None}, {"index": 1, "_id": 0})
+        )
+        jobs.update_one({"_id": job_id}, {"$set": {"done": len(done), "failed": 0}})
+        cache = EvaluationCache()
+        for _, (idx, prompt, response), result, error, _ in iter_deduplicated(
+            pending(),
+            lambda entries: iter_pack_evaluations(iter_packs(entries), evaluate, concurrency),
+            make_index(job.get("dedup")),
+            number=lambda _, entry: entry[0]
+        ):
+            if lost.is_set():
+                raise JobLost(job_id)
+            row = {
+                "job_id": job_id,
+                "index": idx,
+                "prompt": prompt,
+                "response": response,
+                "written_at": datetime.now(timezone.utc)
+            }
+            if error:
+                row["error"] = str(error)
+                counts["failed"] += 1
+            else:
+                row["evaluation"] = select_parameters(result[0], param_keys)
+                row[AI_DETECTION_KEY] = result[0].get(AI_DETECTION_KEY)
+                history.add(prompt, response, result[0])
+                counts["done"] += 1
+            buffer.append(row)
+            if len(buffer) >= FLUSH_ROWS or time.monotonic() - flushed_at > FLUSH_SECONDS:
+                flush()
+                flushed_at = time.monotonic()
+        flush()
+        finished = jobs.update_one(
+            {"_id": job_id, "worker": worker, "status": "running"},
+            {"$set": {"status": "done", "total": read[0], "finished_at": datetime.now(timezone.utc)}}
+        )
+        if not finished.matched_count:
+            raise JobLost(job_id)
+        delete_input(db, job)
+    except JobLost:
+        logger.info("Job %s was cancelled or taken over, stopping", job_id)
+        try:
+            current = jobs.find_one({"_id": job_id}, {"status": 1})
+        except PyMongoError as e:
+            logger.warning("Could not read the status of job %s: %s", job_id, e)
+            current = None
+        if current and current["status"] == "cancelled":
+            delete_input(db, job)
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        try:
+            failed = jobs.update_one(
+                {"_id": job_id, "worker": worker, "status": "running"},
+                {"$set": {"status": "failed", "error": str(e), "finished_at": datetime.now(timezone.utc)}}
+            )
+        except PyMongoError as e:
+            # the lease runs out and another worker picks the job up again
+            logger.warning("Could not mark job %s as failed: %s", job_id, e)
+        else:
+            if failed.matched_count:
+                delete_input(db, job)
+    finally:
+        stop.set()
+
+def run_worker(stop=None, concurrency=DEFAULT_CONCURRENCY):
+    """Claim and run jobs until stop is set"""
+    stop = stop or threading.Event()
+    db = get_database()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    while not stop.is_set():
+        try:
+            job = claim_job(db[JOBS_COLLECTION], worker)
+        except PyMongoError as e:
+            logger.warning("Job queue unavailable: %s", e)
+            job = None
+        if job is None:
+            stop.wait(POLL_SECONDS)
+            continue
+        logger.info("Running job %s (%s) for %s", job["_id"], job["source"], job["user_email"])
+        try:
+            run_job(db, job, worker, concurrency)
+        except Exception:
+            logger.exception("Worker error while running job %s", job["_id"])
+
+def _worker_process(concurrency):
+    logging.basicConfig(level=logging.INFO)
+    try:
+        run_worker(concurrency=concurrency)
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run evaluation jobs submitted from the checker page. Start it on as many hosts as needed."
+    )
+    parser.add_argument("--workers", type=int, default=1, help="worker processes on this host")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="API calls in flight per worker")
+    args = parser.parse_args(argv)
+    if args.workers == 1:
+        _worker_process(args.concurrency)
+        return
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_worker_process, args=(args.concurrency,)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
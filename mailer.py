@@ -0,0 +1,173 @@
+import argparse
+import logging
+import os
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.mime.text import MIMEText
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from db import get_database
+
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", 2))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+STARTTLS = os.getenv("EMAIL_STARTTLS", "1") != "0"
+SMTP_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", 20))
+IDLE_SECONDS = float(os.getenv("EMAIL_IDLE_SECONDS", 60))
+POLL_SECONDS = 5
+LEASE_SECONDS = 120
+BACKOFF_BASE = 5
+BACKOFF_CAP = 900
+
+OUTBOX = "email_outbox"
+
+logger = logging.getLogger(__name__)
+
+_workers = []
+_workers_lock = threading.Lock()
+_wake = threading.Event()
+
+def enqueue_email(to, subject, html):
+    """Store a message in the outbox and wake the workers; delivery happens in the background"""
+    now = datetime.now(timezone.utc)
+    result = get_database()[OUTBOX].insert_one({
+        "to": to,
+        "subject": subject,
+        "html": html,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now
+    })
+    start_workers()
+    _wake.set()
+    return result.inserted_id
+
+def build_message(job):
+    message = MIMEText(job["html"], 'html')
+    message['Subject'] = job["subject"]
+    message['From'] = os.getenv("EMAIL_USER")
+    message['To'] = job["to"]
+    return message
+
+class SmtpConnection:
+    """One SMTP session reused across messages; reopened when the server drops it or after IDLE_SECONDS idle."""
+
+    def __init__(self):
+        self.server = None
+        self.used_at = 0.0
+
+    def _connect(self):
+        server = smtplib.SMTP(os.getenv("EMAIL_HOST"), int(os.getenv("EMAIL_PORT", 587)), timeout=SMTP_TIMEOUT)
+        if STARTTLS:
+            server.starttls()
+        if os.getenv("EMAIL_PASS"):
+            server.login(os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASS"))
+        return server
+
+    def idle(self):
+        return self.server is not None and time.monotonic() - self.used_at > IDLE_SECONDS
+
+    def send(self, message):
+        if self.idle():
+            self.close()
+        if self.server is None:
+            self.server = self._connect()
+        try:
+            self.server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self.server = self._connect()
+            self.server.send_message(message)
+        self.used_at = time.monotonic()
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+def claim(outbox):
+    """Atomically lease the next due message; a 'sending' message whose lease ran out is picked up again."""
+    now = datetime.now(timezone.utc)
+    return outbox.find_one_and_update(
+        {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now}},
+        {
+            "$set": {"status": "sending", "next_attempt_at": now + timedelta(seconds=LEASE_SECONDS)},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("next_attempt_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def _permanent(error):
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+def deliver(outbox, connection, job):
+    now = datetime.now(timezone.utc)
+    try:
+        connection.send(build_message(job))
+    except (smtplib.SMTPException, OSError) as e:
+        connection.close()
+        if _permanent(e) or job["attempts"] >= MAX_ATTEMPTS:
+            logger.error("Giving up on email %s to %s after %d attempts: %s", job["_id"], job["to"], job["attempts"], e)
+            update = {"status": "failed", "last_error": str(e), "failed_at": now}
+        else:
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** job["attempts"]))
+            logger.warning("Email %s to %s failed, retrying in %.0fs: %s", job["_id"], job["to"], delay, e)
+            update = {"status": "pending", "last_error": str(e), "next_attempt_at": now + timedelta(seconds=delay)}
+    else:
+        update = {"status": "sent", "sent_at": now}
+    outbox.update_one({"_id": job["_id"]}, {"$set": update})
+
+def run_worker(stop=None):
+    """Deliver queued messages until stop is set, keeping one SMTP connection open between messages."""
+    stop = stop or threading.Event()
+    outbox = get_database()[OUTBOX]
+    connection = SmtpConnection()
+    try:
+        while not stop.is_set():
+            try:
+                job = claim(outbox)
+                if job is not None:
+                    deliver(outbox, connection, job)
+                    continue
+            except PyMongoError as e:
+                logger.warning("Email outbox unavailable: %s", e)
+            if connection.idle():
+                connection.close()
+            _wake.wait(timeout=POLL_SECONDS)
+            _wake.clear()
+    finally:
+        connection.close()
+
+def start_workers(count=EMAIL_WORKERS):
+    """Start the delivery threads once per process; EMAIL_WORKERS=0 leaves delivery to `python mailer.py`"""
+    with _workers_lock:
+        if not _workers:
+            for n in range(count):
+                worker = threading.Thread(target=run_worker, name=f"email-worker-{n}", daemon=True)
+                worker.start()
+                _workers.append(worker)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deliver queued emails from the MongoDB outbox.")
+    parser.add_argument("--workers", type=int, default=max(1, EMAIL_WORKERS))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    start_workers(args.workers)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
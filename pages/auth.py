@@ -7,22 +7,23 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 import os
-from pymongo import MongoClient
+from db import get_database
+from pymongo.errors import DuplicateKeyError
+from mailer import enqueue_email, start_workers
 from dotenv import load_dotenv
 import hashlib
 import secrets
-import smtplib
-from email.mime.text import MIMEText
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from urllib.parse import quote, unquote, urlencode
 import time
 
 load_dotenv()
 
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client["auth_system"]
+db = get_database()
 pending_users = db["pending_users"]
 verified_users = db["verified_users"]
+# deliver anything left in the outbox by a previous server process
+start_workers()
 
 
 if 'authenticated' not in st.session_state:
@@ -56,16 +57,8 @@ def send_verification_email(email, name, token):
     </html>
     """
     
-    msg = MIMEText(body, 'html')
-    msg['Subject'] = subject
-    msg['From'] = os.getenv("EMAIL_USER")
-    msg['To'] = email
-    
     try:
-        with smtplib.SMTP(os.getenv("EMAIL_HOST"), os.getenv("EMAIL_PORT")) as server:
-            server.starttls()
-            server.login(os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASS"))
-            server.send_message(msg)
+        enqueue_email(email, subject, body)
         return True
     except Exception as e:
         st.error(f"Failed to send verification email: {e}")
@@ -93,16 +86,21 @@ def signup():
             return
         
         verification_token = generate_verification_token()
-        expiry_time = datetime.now() + timedelta(hours=24)
-
-        pending_users.insert_one({
-            "name": name,
-            "email": email,
-            "password": hash_password(password),
-            "verification_token": verification_token,
-            "token_expiry": expiry_time,
-            "created_at": datetime.now()
-        })
+        expiry_time = datetime.now(timezone.utc) + timedelta(hours=24)
+
+        try:
+            pending_users.insert_one({
+                "name": name,
+                "email": email,
+                "password": hash_password(password),
+                "verification_token": verification_token,
+                "token_expiry": expiry_time,
+                "created_at": datetime.now(timezone.utc)
+            })
+        except DuplicateKeyError:
+            # a concurrent signup for the same email won the unique index
+            st.error("Email already registered!")
+            return
         
         if send_verification_email(email, name, verification_token):
             st.success("Registration successful! Please check your email for verification instructions.")
@@ -134,7 +132,7 @@ def verify_email():
             st.error("Invalid verification link or email already verified.")
             return
 
-        if user["token_expiry"] < datetime.now():
+        if user["token_expiry"] < datetime.now(timezone.utc):
             st.error("Verification link has expired. Please register again.")
             pending_users.delete_one({"email": email})
             return
@@ -143,7 +141,7 @@ def verify_email():
             "name": user["name"],
             "email": user["email"],
             "password": user["password"],
-            "verified_at": datetime.now()
+            "verified_at": datetime.now(timezone.utc)
         })
         
         pending_users.delete_one({"email": email})
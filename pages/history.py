@@ -0,0 +1,108 @@
+import streamlit as st
+st.markdown("""
+    <style>
+        section[data-testid="stSidebar"] {
+            display: none !important;
+        }
+    </style>
+""", unsafe_allow_html=True)
+if not st.session_state.get("authenticated", False):
+    st.error("You must be logged in to access this page.")
+    if st.button("Log In"):
+        st.switch_page("pages/auth.py")
+    st.stop()
+
+from datetime import datetime, time, timedelta, timezone
+from history import PAGE_SIZE, get_usage, query_history
+from parameters import ALL_PARAMETERS
+from usage import format_usage
+
+st.title("Evaluation History")
+if st.button("Back to Evaluator"):
+    st.switch_page("pages/checker.py")
+
+try:
+    usage = get_usage(st.session_state.user_email)
+    if usage["calls"]:
+        st.caption(f"Your token usage: {format_usage(usage)}")
+except Exception as e:
+    st.warning(f"Could not load token usage: {str(e)}")
+
+if 'history_cursors' not in st.session_state:
+    st.session_state.history_cursors = [None]
+
+def reset_pages():
+    st.session_state.history_cursors = [None]
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    parameter = st.selectbox(
+        "Parameter",
+        options=[None] + list(ALL_PARAMETERS),
+        format_func=lambda key: "All parameters" if key is None else ALL_PARAMETERS[key],
+        on_change=reset_pages,
+        key="history_parameter"
+    )
+with col2:
+    verdict = st.radio(
+        "Verdict",
+        options=[None, "Y", "N"],
+        format_func=lambda value: {None: "Any", "Y": "Compliant", "N": "Non-compliant"}[value],
+        horizontal=True,
+        on_change=reset_pages,
+        key="history_verdict",
+        disabled=parameter is None
+    )
+with col3:
+    dates = st.date_input("Date range", value=(), on_change=reset_pages, key="history_dates")
+
+since = until = None
+if len(dates) > 0:
+    since = datetime.combine(dates[0], time.min, timezone.utc)
+if len(dates) > 1:
+    until = datetime.combine(dates[1], time.min, timezone.utc) + timedelta(days=1)
+
+try:
+    documents, next_cursor = query_history(
+        st.session_state.user_email,
+        limit=PAGE_SIZE,
+        cursor=st.session_state.history_cursors[-1],
+        parameter=parameter,
+        verdict=verdict if parameter else None,
+        since=since,
+        until=until
+    )
+except Exception as e:
+    st.error(f"Could not load history: {str(e)}")
+    st.stop()
+
+page = len(st.session_state.history_cursors)
+if not documents:
+    st.info("No evaluations found.")
+for offset, document in enumerate(documents, (page - 1) * PAGE_SIZE + 1):
+    created_at = document["created_at"].strftime("%Y-%m-%d %H:%M UTC")
+    with st.expander(f"#{offset} · {created_at} · {document.get('source') or 'manual'}", expanded=False):
+        st.markdown(f"**Prompt:** {document['prompt']}")
+        st.markdown(f"**Response:** {document['response']}")
+        ai_result = document.get("ai_generation")
+        if ai_result and ai_result.get('is_ai_generated') is not None:
+            if ai_result['is_ai_generated']:
+                st.error(f"⚠️ Likely AI-generated (Confidence: {ai_result.get('confidence', 0)}%)")
+            else:
+                st.success(f"✅ Likely human-written (Confidence: {100 - ai_result.get('confidence', 0)}%)")
+        for entry in document["verdicts"]:
+            param, value = entry.rsplit(":", 1)
+            emoji = "✅" if value == "Y" else "❌"
+            reason = document["evaluation"].get(f"{param}_reason") or "No reason provided"
+            st.markdown(f"**{ALL_PARAMETERS.get(param, param)}:** {emoji} {reason}")
+
+col1, col2 = st.columns(2)
+with col1:
+    if page > 1 and st.button("Previous page"):
+        st.session_state.history_cursors.pop()
+        st.rerun()
+with col2:
+    if next_cursor and st.button("Next page"):
+        st.session_state.history_cursors.append(next_cursor)
+        st.rerun()
+st.caption(f"Page {page}")
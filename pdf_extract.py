@@ -0,0 +1,55 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+
+WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+
+_worker_data = None
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+def _page_texts(pdf, start, stop):
+    texts = []
+    for page in pdf.pages[start:stop]:
+        text = page.extract_text()
+        if text:
+            texts.append(text)
+    return texts
+
+def _extract_range(start, stop):
+    with pdfplumber.open(io.BytesIO(_worker_data)) as pdf:
+        return _page_texts(pdf, start, stop)
+
+def iter_pdf_pages(data, workers=WORKERS, pages_per_task=PAGES_PER_TASK):
+    """Yield the text of each page that has any, in page order.
+
+    Documents longer than one task are split into page ranges and extracted
+    in a process pool; results are yielded as soon as the next range is done.
+    """
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        page_count = len(pdf.pages)
+        if workers <= 1 or page_count <= pages_per_task:
+            for start in range(0, page_count, pages_per_task):
+                yield from _page_texts(pdf, start, start + pages_per_task)
+            return
+
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(data,)
+    ) as executor:
+        futures = [executor.submit(_extract_range, start, stop) for start, stop in ranges]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
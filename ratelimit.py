@@ -0,0 +1,162 @@
+import os
+import random
+import re
+import threading
+import time
+
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_RPM", 500))
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TPM", 30000))
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 6))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 60.0
+
+def retryable_errors():
+    import openai
+    return (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    ), openai.RateLimitError
+
+def parse_duration(value):
+    """Parse rate-limit header durations such as '1s', '6m0s', '20ms' or '0.5' into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    seconds = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        seconds += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return seconds
+
+def retry_after(headers):
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        return float(headers["retry-after-ms"]) / 1000
+    return parse_duration(headers.get("retry-after"))
+
+class RateLimiter:
+    """Client-side request/token budgets with adaptive concurrency for OpenAI calls.
+
+    Budgets refill continuously at the per-minute rates and are tightened by
+    the x-ratelimit-* headers the API returns. Concurrency grows by one after
+    a run of successful calls and halves on every 429.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.concurrency = max_concurrency
+        self.throttled = 0
+        self.retries = 0
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._active = 0
+        self._successes = 0
+        self._blocked_until = 0.0
+        self._refilled_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens):
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                waits = [self._blocked_until - now]
+                if self._requests < 1:
+                    waits.append((1 - self._requests) * 60 / self.requests_per_minute)
+                if self._tokens < tokens:
+                    waits.append((tokens - self._tokens) * 60 / self.tokens_per_minute)
+                wait = max(waits)
+                if wait <= 0 and self._active < self.concurrency:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    self._active += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, headers=None, throttled=False):
+        with self._cond:
+            self._active -= 1
+            now = time.monotonic()
+            if throttled:
+                self.throttled += 1
+                self.concurrency = max(1, self.concurrency // 2)
+                self._successes = 0
+                self._blocked_until = max(self._blocked_until, now + (retry_after(headers) or BACKOFF_BASE))
+            else:
+                self._successes += 1
+                if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            if headers:
+                self._apply_headers(headers, now)
+            self._cond.notify_all()
+
+    def _apply_headers(self, headers, now):
+        self._refill(now)
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None:
+            self._requests = min(self._requests, float(remaining))
+        remaining = headers.get("x-ratelimit-remaining-tokens")
+        if remaining is not None:
+            self._tokens = min(self._tokens, float(remaining))
+
+    def settle(self, estimated_tokens, used_tokens):
+        """Correct the token budget once the real usage of a call is known."""
+        if used_tokens is None:
+            return
+        with self._cond:
+            self._tokens += min(estimated_tokens, self.tokens_per_minute) - used_tokens
+            self._cond.notify_all()
+
+    def call(self, request, estimated_tokens):
+        """Run request() within the budgets, retrying retryable errors with jittered exponential backoff.
+
+        request should return a raw OpenAI response so its rate-limit headers can be read.
+        """
+        retryable, rate_limit_error = retryable_errors()
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated_tokens)
+            try:
+                raw = request()
+            except retryable + (rate_limit_error,) as e:
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                self.release(headers, throttled=isinstance(e, rate_limit_error))
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = retry_after(headers)
+                if delay is None:
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                time.sleep(delay)
+                continue
+            except Exception:
+                self.release()
+                raise
+            self.release(getattr(raw, "headers", None))
+            return raw
+
+    def stats(self):
+        with self._cond:
+            return {
+                "concurrency": self.concurrency,
+                "active": self._active,
+                "throttled": self.throttled,
+                "retries": self.retries
+            }
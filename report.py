@@ -0,0 +1,246 @@
+import os
+import tempfile
+from itertools import count
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 10 * mm
+BOTTOM_MARGIN = 15 * mm
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+WIDTH_CACHE_SIZE = 100000
+
+BLACK = (0, 0, 0)
+GREEN = (46 / 255, 204 / 255, 113 / 255)
+RED = (231 / 255, 76 / 255, 60 / 255)
+
+FONTS = {
+    '': 'Helvetica',
+    'B': 'Helvetica-Bold',
+    'I': 'Helvetica-Oblique'
+}
+
+def safe_text(text):
+    """Sanitize text while preserving readability"""
+    if not isinstance(text, str):
+        text = str(text)
+    return text.encode('ascii', 'replace').decode('ascii').replace('?', ' ')
+
+class ReportWriter:
+    """Lays out the evaluation report page by page on a reportlab canvas.
+
+    Words are measured once each and lines are placed directly, so layout
+    time is linear in the amount of text. Memory is not bounded: reportlab
+    keeps every finished page, compressed, until close() writes the whole
+    document to the output file, so it grows with the size of the PDF.
+    """
+
+    def __init__(self, path):
+        self.canvas = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        self.canvas.setTitle("LLM Response Evaluation Report")
+        self.page = 0
+        self.y = 0
+        self._widths = {}
+        self.set_font('', 11)
+        self.add_page()
+
+    def set_font(self, style, size=None):
+        self.font = FONTS[style]
+        self.font_size = size or self.font_size
+        self.canvas.setFont(self.font, self.font_size)
+
+    def add_page(self):
+        if self.page:
+            self._footer()
+            self.canvas.showPage()
+        self.page += 1
+        font, size = self.font, self.font_size
+        self.y = PAGE_HEIGHT - MARGIN
+        self.canvas.setFillColorRGB(*BLACK)
+        self.set_font('B', 12)
+        self.cell('LLM Response Evaluation Report', 10 * mm, align='C')
+        self.ln(10 * mm)
+        self.font, self.font_size = font, size
+        self.canvas.setFont(font, size)
+
+    def _footer(self):
+        self.canvas.setFillColorRGB(*BLACK)
+        self.canvas.setFont(FONTS['I'], 8)
+        self.canvas.drawCentredString(PAGE_WIDTH / 2, 10 * mm, f'Page {self.page}')
+
+    def ensure(self, height):
+        if self.y - height < BOTTOM_MARGIN:
+            self.add_page()
+
+    def ln(self, height):
+        self.y -= height
+
+    def word_width(self, word):
+        key = (self.font, self.font_size, word)
+        width = self._widths.get(key)
+        if width is None:
+            if len(self._widths) >= WIDTH_CACHE_SIZE:
+                self._widths.clear()
+            width = stringWidth(word, self.font, self.font_size)
+            self._widths[key] = width
+        return width
+
+    def split_word(self, word, width):
+        """Break a word wider than width, such as a URL, into pieces that fit"""
+        pieces = []
+        start = 0
+        piece_width = 0
+        for n, char in enumerate(word):
+            char_width = self.word_width(char)
+            if n > start and piece_width + char_width > width:
+                pieces.append(word[start:n])
+                start = n
+                piece_width = 0
+            piece_width += char_width
+        pieces.append(word[start:])
+        return pieces
+
+    def wrap(self, text, width):
+        space = self.word_width(' ')
+        lines = []
+        current = []
+        current_width = 0
+        for word in safe_text(text).split():
+            word_width = self.word_width(word)
+            if word_width > width:
+                if current:
+                    lines.append(' '.join(current))
+                *full, word = self.split_word(word, width)
+                lines.extend(full)
+                current = [word]
+                current_width = self.word_width(word)
+            elif current and current_width + space + word_width > width:
+                lines.append(' '.join(current))
+                current = [word]
+                current_width = word_width
+            else:
+                current_width += (space if current else 0) + word_width
+                current.append(word)
+        if current:
+            lines.append(' '.join(current))
+        return lines
+
+    def _baseline(self, top, height):
+        return top - height / 2 - self.font_size * 0.35
+
+    def cell(self, text, height, x=MARGIN, width=TEXT_WIDTH, align='L'):
+        self.ensure(height)
+        baseline = self._baseline(self.y, height)
+        if align == 'C':
+            self.canvas.drawCentredString(x + width / 2, baseline, text)
+        else:
+            self.canvas.drawString(x + 1, baseline, text)
+        self.ln(height)
+
+    def write_wrapped_text(self, text, indent=0, line_height=5 * mm, color=BLACK):
+        self.canvas.setFillColorRGB(*color)
+        for line in self.wrap(text, TEXT_WIDTH - indent - 2):
+            self.cell(line, line_height, x=MARGIN + indent, width=TEXT_WIDTH - indent)
+        self.canvas.setFillColorRGB(*BLACK)
+
+    def parameter_row(self, name, verdict, reason, row_height=8 * mm):
+        name_width = 50 * mm
+        verdict_width = 15 * mm
+        reason_x = MARGIN + name_width + verdict_width
+        reason_width = TEXT_WIDTH - name_width - verdict_width
+        lines = self.wrap(reason, reason_width - 2) or ['']
+        self.ensure(row_height)
+
+        self.canvas.setFillColorRGB(*(GREEN if verdict == "Y" else RED))
+        self.canvas.rect(MARGIN, self.y - row_height, name_width, row_height, stroke=1, fill=1)
+        self.canvas.rect(MARGIN + name_width, self.y - row_height, verdict_width, row_height, stroke=1, fill=1)
+        self.canvas.setFillColorRGB(*BLACK)
+        baseline = self._baseline(self.y, row_height)
+        self.canvas.drawString(MARGIN + 1, baseline, safe_text(name))
+        self.canvas.drawCentredString(MARGIN + name_width + verdict_width / 2, baseline, safe_text(verdict))
+
+        for line in lines:
+            self.ensure(row_height)
+            self.canvas.rect(reason_x, self.y - row_height, reason_width, row_height, stroke=1, fill=0)
+            self.canvas.drawString(reason_x + 1, self._baseline(self.y, row_height), line)
+            self.ln(row_height)
+
+    def close(self):
+        self._footer()
+        self.canvas.save()
+
+def write_pdf_report(evaluations, path, ai_results=None, numbers=None):
+    """Write the report for an iterable of (prompt, response, evaluation) tuples to path.
+
+    numbers gives each evaluation's entry number (1, 2, ... by default), so
+    a report that skips failed entries keeps the numbers of the input.
+    evaluations are read one at a time, but the finished pages are held in
+    memory until the file is saved; see ReportWriter.
+    """
+    pdf = ReportWriter(path)
+
+    pdf.set_font('B', 16)
+    pdf.cell("LLM Response Evaluation Report", 10 * mm, align='C')
+    pdf.ln(10 * mm)
+
+    numbers = iter(numbers or count(1))
+    for idx, (prompt, response, evaluation) in enumerate(evaluations, 1):
+        pdf.set_font('B', 12)
+        pdf.cell(f"Evaluation #{next(numbers)}", 10 * mm)
+        if evaluation.get("reused_from") is not None:
+            pdf.set_font('I', 10)
+            pdf.write_wrapped_text(f"Duplicate of evaluation #{evaluation['reused_from'] + 1}; its result was reused.")
+        pdf.set_font('B', 11)
+        pdf.cell("Prompt:", 5 * mm)
+        pdf.set_font('')
+        pdf.write_wrapped_text(prompt, indent=10 * mm)
+
+        pdf.set_font('B')
+        pdf.cell("Response:", 5 * mm)
+        pdf.set_font('')
+        pdf.write_wrapped_text(response, indent=10 * mm)
+        pdf.ln(5 * mm)
+
+        if ai_results and idx-1 < len(ai_results) and ai_results[idx-1]:
+            ai_result = ai_results[idx-1]
+            pdf.set_font('B')
+            pdf.cell("AI Detection:", 5 * mm)
+            pdf.set_font('')
+
+            if ai_result.get('is_ai_generated', False):
+                color = RED
+                status = f"⚠ Likely AI-generated (Confidence: {ai_result.get('confidence', 0)}%)"
+            else:
+                color = GREEN
+                status = f"✓ Likely human-written (Confidence: {100 - ai_result.get('confidence', 0)}%)"
+
+            pdf.write_wrapped_text(status, indent=10 * mm, color=color)
+            pdf.write_wrapped_text(f"Reason: {ai_result.get('reason', 'No reason provided')}", indent=10 * mm)
+            pdf.ln(5 * mm)
+
+        pdf.set_font('B')
+        pdf.cell("Parameter Evaluations:", 5 * mm)
+        pdf.set_font('', 11)
+
+        for param, result in evaluation.items():
+            if not param.endswith('_reason') and isinstance(result, str):
+                param_name = param.replace('_', ' ').title()
+                reason = evaluation.get(f"{param}_reason", "No reason provided")
+                pdf.parameter_row(param_name, result, reason)
+
+        pdf.ln(10 * mm)
+
+    pdf.close()
+
+def generate_pdf_report(evaluations, ai_results=None):
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        write_pdf_report(evaluations, path, ai_results)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
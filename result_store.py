@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from array import array
+from bisect import bisect_left
+
+SPILL_DIR = os.getenv("RESULT_SPILL_DIR") or None
+
+VERDICT_CODES = {"Y": 1, "N": 2}
+VERDICTS = {1: "Y", 2: "N"}
+
+def _pair_key(prompt, response):
+    digest = hashlib.blake2b(f"{prompt}\0{response}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+class ResultStore:
+    """Compact, append-only store for one session's (prompt, response, evaluation) results.
+
+    Only fixed-width arrays stay in memory: one verdict byte per parameter,
+    the input index, and the offset and length of a record in a spill file
+    that holds the prompt, response, reasons and AI-detection result.
+    Other per-session files such as exports can be kept in `directory`;
+    it is removed when the store is garbage collected with its session.
+    """
+
+    def __init__(self, param_keys, spill_dir=SPILL_DIR):
+        self.param_keys = tuple(param_keys)
+        self._verdicts = bytearray()
+        self._indices = array("Q")
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        self._pair_keys = array("Q")
+        self._order = None
+        self._pair_index = None
+        self._lock = threading.Lock()
+        self.directory = tempfile.mkdtemp(prefix="llm_results_", dir=spill_dir)
+        self._file = open(os.path.join(self.directory, "results.jsonl"), "w+b")
+        self._size = 0
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, ignore_errors=True)
+
+    def append(self, prompt, response, evaluation, index=None):
+        """Add a result; index is its position in the input when results arrive out of order"""
+        record = json.dumps([
+            prompt,
+            response,
+            [evaluation.get(f"{key}_reason") for key in self.param_keys],
+            evaluation.get("ai_generation"),
+            evaluation.get("reused_from")
+        ], ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            row = len(self._offsets)
+            self._file.seek(self._size)
+            self._file.write(record)
+            self._offsets.append(self._size)
+            self._lengths.append(len(record))
+            self._size += len(record)
+            self._indices.append(row if index is None else index)
+            self._verdicts.extend(VERDICT_CODES.get(evaluation.get(key), 0) for key in self.param_keys)
+            self._pair_keys.append(_pair_key(prompt, response))
+            self._order = None
+            self._pair_index = None
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _row_order(self):
+        if self._order is None:
+            self._order = array("Q", sorted(range(len(self._indices)), key=self._indices.__getitem__))
+        return self._order
+
+    def _read(self, row):
+        with self._lock:
+            self._file.flush()
+            self._file.seek(self._offsets[row])
+            prompt, response, reasons, ai_result, reused_from = json.loads(self._file.read(self._lengths[row]))
+        evaluation = {}
+        width = len(self.param_keys)
+        for n, (key, reason) in enumerate(zip(self.param_keys, reasons)):
+            code = self._verdicts[row * width + n]
+            if code:
+                evaluation[key] = VERDICTS[code]
+                evaluation[f"{key}_reason"] = reason
+        if ai_result is not None:
+            evaluation["ai_generation"] = ai_result
+        if reused_from is not None:
+            evaluation["reused_from"] = reused_from
+        return prompt, response, evaluation
+
+    def __getitem__(self, position):
+        """Results in input order; slices read only the records they cover"""
+        order = self._row_order()
+        if isinstance(position, slice):
+            return [self._read(order[n]) for n in range(*position.indices(len(order)))]
+        return self._read(order[position])
+
+    def __iter__(self):
+        for row in self._row_order():
+            yield self._read(row)
+
+    def indices(self, start=0, stop=None):
+        """Input indices of the results at positions start to stop, in input order"""
+        return array("Q", (self._indices[row] for row in self._row_order()[start:stop]))
+
+    def get(self, pair):
+        """The stored evaluation for a (prompt, response) pair, or None"""
+        if self._pair_index is None:
+            rows = sorted(range(len(self._pair_keys)), key=self._pair_keys.__getitem__)
+            self._pair_index = (array("Q", (self._pair_keys[row] for row in rows)), array("Q", rows))
+        keys, rows = self._pair_index
+        key = _pair_key(*pair)
+        position = bisect_left(keys, key)
+        while position < len(keys) and keys[position] == key:
+            prompt, response, evaluation = self._read(rows[position])
+            if (prompt, response) == tuple(pair):
+                return evaluation
+            position += 1
+        return None
+
+    def summary(self):
+        """{param_key: [compliant, non_compliant]} computed from the in-memory verdicts"""
+        width = len(self.param_keys)
+        return {
+            key: [self._verdicts[n::width].count(1), self._verdicts[n::width].count(2)]
+            for n, key in enumerate(self.param_keys)
+        } if width else {}
+
+    def memory_bytes(self):
+        arrays = (self._indices, self._offsets, self._lengths, self._pair_keys)
+        return len(self._verdicts) + sum(values.itemsize * len(values) for values in arrays)
+
+    def close(self):
+        self._file.close()
+        self._finalizer()
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+pytest.importorskip("reportlab")
+
+from benchmark import print_run
+
+RUN = {
+    "commit": "abc1234",
+    "timestamp": "2026-01-01T00:00:00",
+    "settings": {},
+    "startup": {"checker": 120.0, "deferred": 900.0},
+    "corpora": [{
+        "format": "txt",
+        "pairs": 10,
+        "bytes": 1000,
+        "stages": [{"stage": "parse", "items": 10, "seconds": 0.5, "throughput": 20.0, "peak_mb": 1.0}]
+    }]
+}
+
+def test_print_run_without_previous_run(capsys):
+    print_run(RUN, None)
+    output = capsys.readouterr().out
+    assert "startup checker" in output
+    assert "Comparing with" not in output
+
+def test_print_run_compares_with_previous_run(capsys):
+    previous = dict(RUN, commit="def5678", corpora=[{
+        **RUN["corpora"][0],
+        "stages": [dict(RUN["corpora"][0]["stages"][0], seconds=1.0)]
+    }])
+    print_run(RUN, previous)
+    output = capsys.readouterr().out
+    assert "Comparing with def5678" in output
+    assert "-50%" in output
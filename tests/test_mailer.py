@@ -0,0 +1,79 @@
+import socket
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+import fake_smtp
+import mailer
+
+class Outbox:
+    """Records the updates deliver() makes to the outbox collection"""
+
+    def __init__(self):
+        self.updates = []
+
+    def update_one(self, query, update):
+        self.updates.append(update["$set"])
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp(monkeypatch):
+    def start(**options):
+        port = free_port()
+        controller = fake_smtp.serve(port=port, **options)
+        controllers.append(controller)
+        monkeypatch.setenv("EMAIL_HOST", "127.0.0.1")
+        monkeypatch.setenv("EMAIL_PORT", str(port))
+        return controller.handler
+
+    controllers = []
+    monkeypatch.setattr(mailer, "STARTTLS", False)
+    monkeypatch.delenv("EMAIL_PASS", raising=False)
+    monkeypatch.setenv("EMAIL_USER", "noreply@example.com")
+    yield start
+    for controller in controllers:
+        controller.stop()
+
+def job(attempts=1):
+    return {"_id": 1, "to": "user@example.com", "subject": "Verify", "html": "<p>Hi</p>", "attempts": attempts}
+
+def test_connection_reuses_one_session(smtp):
+    handler = smtp()
+    connection = mailer.SmtpConnection()
+    outbox = Outbox()
+    for _ in range(3):
+        mailer.deliver(outbox, connection, job())
+    connection.close()
+    assert len(handler.messages) == 3
+    assert handler.sessions == 1
+    assert [update["status"] for update in outbox.updates] == ["sent"] * 3
+
+def test_temporary_failure_is_retried_with_backoff(smtp, monkeypatch):
+    handler = smtp(fail_rate=1.0, fail_code=451)
+    # the longest delay the jittered backoff allows
+    monkeypatch.setattr(mailer.random, "uniform", lambda low, high: high)
+    outbox = Outbox()
+    before = datetime.now(timezone.utc)
+    mailer.deliver(outbox, mailer.SmtpConnection(), job(attempts=2))
+    update, = outbox.updates
+    assert handler.rejected == 1
+    assert update["status"] == "pending"
+    assert "451" in update["last_error"]
+    delay = (update["next_attempt_at"] - before).total_seconds()
+    assert mailer.BACKOFF_BASE * 2 ** 2 <= delay < mailer.BACKOFF_BASE * 2 ** 2 + 1
+
+def test_permanent_failure_marks_message_failed(smtp):
+    smtp(fail_rate=1.0, fail_code=550)
+    outbox = Outbox()
+    mailer.deliver(outbox, mailer.SmtpConnection(), job())
+    update, = outbox.updates
+    assert update["status"] == "failed"
+    assert "550" in update["last_error"]
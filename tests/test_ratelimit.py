@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+import fake_openai
+from ratelimit import RateLimiter
+
+@pytest.fixture
+def server():
+    server = fake_openai.serve(error_rate=1.0, retry_after=0.01)
+    yield server
+    server.shutdown()
+
+def make_request(server):
+    client = openai.OpenAI(
+        api_key="test", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", max_retries=0
+    )
+    return lambda: client.chat.completions.with_raw_response.create(
+        model="fake", messages=[{"role": "user", "content": "Evaluate these parameters: bias"}]
+    )
+
+def test_retry_after_ms_is_honoured(server):
+    # the first backoff without the header would be at most 0.5 seconds
+    server.settings.retry_after = 1.0
+    limiter = RateLimiter(max_retries=1)
+    started = time.monotonic()
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(make_request(server), 10)
+    assert time.monotonic() - started >= 1.0
+    assert limiter.retries == 1
+
+def test_concurrency_halves_on_429_and_grows_back(server):
+    limiter = RateLimiter(max_concurrency=8, max_retries=0)
+    request = make_request(server)
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(request, 10)
+    assert limiter.stats()["concurrency"] == 4
+    assert limiter.throttled == 1
+
+    server.settings.error_rate = 0.0
+    for _ in range(4):
+        limiter.call(request, 10)
+    assert limiter.stats()["concurrency"] == 5
+
+def test_calls_fail_after_max_retries(server):
+    limiter = RateLimiter(max_concurrency=8, max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(make_request(server), 10)
+    assert server.requests == 3
+    assert limiter.stats() == {"concurrency": 1, "active": 0, "throttled": 3, "retries": 2}
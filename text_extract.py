@@ -0,0 +1,93 @@
+import codecs
+import os
+
+TXT_SAMPLE_BYTES = int(os.getenv("TXT_SAMPLE_BYTES", 1024 * 1024))
+TXT_BLOCK_BYTES = int(os.getenv("TXT_BLOCK_BYTES", 1024 * 1024))
+DETECT_BLOCK_BYTES = 64 * 1024
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+def _is_utf8(sample):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        # final=False so a character cut off at the end of the sample is not an error
+        decoder.decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def _chardet_encoding(sample):
+    from chardet.universaldetector import UniversalDetector
+    detector = UniversalDetector()
+    for offset in range(0, len(sample), DETECT_BLOCK_BYTES):
+        detector.feed(sample[offset:offset + DETECT_BLOCK_BYTES])
+        if detector.done:
+            break
+    detector.close()
+    return detector.result.get("encoding") or "utf-8"
+
+def detect_encoding(file, sample_bytes=TXT_SAMPLE_BYTES):
+    """Guess the encoding of a binary file from at most sample_bytes, then rewind it.
+
+    A byte-order mark or a valid UTF-8 sample is decided without chardet;
+    otherwise chardet is fed the sample block by block and stops as soon
+    as it is confident.
+    """
+    start = file.tell()
+    sample = file.read(sample_bytes)
+    file.seek(start)
+
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    if _is_utf8(sample):
+        return "utf-8"
+    return _chardet_encoding(sample)
+
+def iter_text_chunks(file, encoding=None, block_bytes=TXT_BLOCK_BYTES):
+    """Decode a binary text file block by block, yielding chunks that end on a line break.
+
+    A line longer than block_bytes is yielded in block-sized pieces, so
+    memory and time stay linear even for files without line breaks. When
+    UTF-8 was only guessed from the sample and a later block turns out not
+    to be UTF-8, the rest of the file is re-detected from that block on.
+    """
+    guessed = encoding is None
+    encoding = encoding or detect_encoding(file)
+    strict = guessed and encoding == "utf-8"
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict" if strict else "replace")
+    tail = ""
+    while True:
+        start = file.tell()
+        pending = decoder.getstate()[0]
+        block = file.read(block_bytes)
+        try:
+            decoded = decoder.decode(block, final=not block)
+        except UnicodeDecodeError:
+            # the sample looked like UTF-8 but this part is not; undecoded bytes
+            # held over from the previous block are re-read with the new encoding
+            file.seek(start - len(pending))
+            sample = file.read(TXT_SAMPLE_BYTES)
+            file.seek(start - len(pending))
+            decoder = codecs.getincrementaldecoder(_chardet_encoding(sample))(errors="replace")
+            continue
+        text = tail + decoded
+        if not block:
+            if text:
+                yield text
+            return
+        cut = text.rfind("\n") + 1
+        if cut:
+            yield text[:cut]
+            tail = text[cut:]
+        elif len(text) >= block_bytes:
+            yield text
+            tail = ""
+        else:
+            tail = text
@@ -0,0 +1,58 @@
+import threading
+
+USAGE_FIELDS = ("calls", "prompt_tokens", "cached_tokens", "completion_tokens", "latency_ms")
+
+def usage_from_completion(completion, latency_ms):
+    """Read prompt, cached and completion tokens from a chat completion's usage field"""
+    usage = getattr(completion, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "calls": 1,
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+        "latency_ms": latency_ms
+    }
+
+def usage_summary(totals):
+    """Add averages and the share of prompt tokens served from the provider's prefix cache"""
+    totals = {field: totals.get(field, 0) for field in USAGE_FIELDS}
+    calls = totals["calls"]
+    totals["cached_rate"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+    totals["avg_latency_ms"] = totals["latency_ms"] / calls if calls else 0.0
+    return totals
+
+def format_usage(totals):
+    summary = usage_summary(totals)
+    return (
+        f"{summary['calls']} calls, {summary['prompt_tokens']} prompt tokens "
+        f"({summary['cached_rate']:.0%} cached), {summary['completion_tokens']} completion tokens, "
+        f"{summary['avg_latency_ms']:.0f} ms average latency"
+    )
+
+class UsageMeter:
+    """Thread-safe running totals of the token usage and latency of LLM calls.
+
+    drain() returns what was recorded since the last drain, for callers that
+    persist usage incrementally.
+    """
+
+    def __init__(self):
+        self._totals = dict.fromkeys(USAGE_FIELDS, 0)
+        self._undrained = dict.fromkeys(USAGE_FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def record(self, usage):
+        with self._lock:
+            for field in USAGE_FIELDS:
+                self._totals[field] += usage.get(field, 0)
+                self._undrained[field] += usage.get(field, 0)
+
+    def totals(self):
+        with self._lock:
+            return dict(self._totals)
+
+    def drain(self):
+        with self._lock:
+            undrained, self._undrained = self._undrained, dict.fromkeys(USAGE_FIELDS, 0)
+        return undrained